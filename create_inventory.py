@@ -1,19 +1,67 @@
 # create_inventory.py
-import json
+import argparse
 import os
+import re
+import sys
+from collections import defaultdict
 from pathlib import Path
 import requests
 
+import fast_json
+from main import airthings_api_url, http_session, invalidate_cached_token, read_cached_token, request_access_token, request_timeout, wave_device_type_prefix
+
 inventory_file_name = "inventory.json"
+inventory_path = Path(__file__).resolve().parent / inventory_file_name
+devices_url = airthings_api_url + "/devices"
+
+# Pre-checks for safe_input so bad numbers are rejected without raising ValueError
+input_validators = {
+    int: re.compile(r"\s*[-+]?\d+\s*").fullmatch,
+    float: re.compile(r"\s*[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?\s*").fullmatch,
+}
 
 def clear():
     """
     Clears the console screen.
 
-    This function uses the appropriate system command to clear the console
-    screen based on the operating system.
+    On POSIX systems this function writes the ANSI clear-screen sequence
+    directly to stdout instead of spawning a shell to run "clear". Windows
+    consoles only understand the sequence once VT processing is enabled, so
+    "cls" is used there instead. Nothing is done when stdout is not a terminal.
+    """
+    if not sys.stdout.isatty():
+        return
+    if os.name == "nt":
+        os.system("cls")
+    else:
+        sys.stdout.write("\x1b[2J\x1b[3J\x1b[H")
+        sys.stdout.flush()
+
+def read_line(prompt):
+    """
+    Reads a line of input from the user.
+
+    On an interactive terminal this defers to input() so line editing keeps
+    working. When stdin is piped or redirected, the prompt is written and the
+    line is read directly from sys.stdin, skipping the readline machinery.
+
+    Args:
+        prompt (str): The prompt to display to the user.
+
+    Returns:
+        str: The line entered, without the trailing newline.
+
+    Raises:
+        EOFError: If stdin is exhausted.
     """
-    os.system("cls" if os.name == "nt" else "clear")
+    if sys.stdin.isatty():
+        return input(prompt)
+    sys.stdout.write(prompt)
+    sys.stdout.flush()
+    line = sys.stdin.readline()
+    if not line:
+        raise EOFError
+    return line.rstrip("\n")
 
 def safe_input(prompt, type_=str, default=None):
     """
@@ -30,54 +78,79 @@ def safe_input(prompt, type_=str, default=None):
     Returns:
         The user input converted to the specified type, or the default value if provided.
     """
+    error = f"[!]\tInvalid input. Expected a {type_.__name__}.\n"
+    validate = input_validators.get(type_)
     while True:
-        try:
-            return type_(input(prompt))
-        except ValueError:
-            print(f"[!]\tInvalid input. Expected a {type_.__name__}.")
+        value = read_line(prompt)
+        if validate is None:
+            try:
+                return type_(value)
+            except ValueError:
+                pass
+        elif validate(value):
+            return type_(value)
+        sys.stdout.write(error)
         if default is not None:
             return default
 
+def credentials_rejected(error):
+    """
+    Checks whether a failed token request was refused because of the credentials.
+
+    Args:
+        error (Exception): The exception raised while requesting the token.
+
+    Returns:
+        bool: True if the token endpoint answered 400 or 401, False otherwise.
+    """
+    response = getattr(error, "response", None)
+    return isinstance(error, requests.exceptions.HTTPError) and response is not None and response.status_code in (400, 401)
+
 def get_airthings_devices(client_id, client_secret):
     """
     Fetches device information from the Airthings API.
 
     This function authenticates with the Airthings API using the provided
     credentials and retrieves information about all devices associated
-    with the account.
+    with the account. Authentication is shared with main.py, so an access
+    token saved by the poller is reused while it is still valid.
 
     Args:
         client_id (str): The Airthings API client ID.
         client_secret (str): The Airthings API client secret.
 
     Returns:
-        list: A list of dictionaries containing device information, or None if the request fails.
+        tuple: A list of dictionaries containing device information, or None if the
+            request fails, and True if it failed because the credentials were rejected.
     """
-    token_url = "https://accounts-api.airthings.com/v1/token"
-    api_url = "https://ext-api.airthings.com/v1/devices"
-
-    # Get access token
-    token_data = {
-        "grant_type": "client_credentials",
-        "client_id": client_id,
-        "client_secret": client_secret,
-        "scope": "read:device:current_values"
-    }
-    token_response = requests.post(token_url, data=token_data)
-    if token_response.status_code != 200:
-        print("[!]\tFailed to obtain access token")
-        return None
-
-    access_token = token_response.json()["access_token"]
-
-    # Get devices
-    headers = {"Authorization": f"Bearer {access_token}"}
-    devices_response = requests.get(api_url, headers=headers)
-    if devices_response.status_code != 200:
-        print("[!]\tFailed to fetch devices")
-        return None
-
-    return devices_response.json().get("devices", [])
+    def get_devices(token):
+        return http_session.get(devices_url, headers={"Authorization": f"Bearer {token}"}, timeout=request_timeout)
+
+    try:
+        token = read_cached_token(client_id) or request_access_token(client_id, client_secret)
+        devices_response = get_devices(token)
+        if devices_response.status_code == 401:
+            # The saved token was rejected, so get a fresh one and retry once
+            invalidate_cached_token()
+            devices_response = get_devices(request_access_token(client_id, client_secret))
+            if devices_response.status_code == 401:
+                print("[!]\tThe Airthings API rejected the credentials")
+                return None, True
+        if devices_response.status_code != 200:
+            print("[!]\tFailed to fetch devices")
+            return None, False
+        return fast_json.loads(devices_response.content).get("devices", []), False
+    except requests.exceptions.HTTPError as e:
+        # Only the token request raises for an HTTP error status
+        if credentials_rejected(e):
+            print("[!]\tThe Airthings API rejected the credentials")
+            return None, True
+        print(f"[!]\tFailed to obtain access token: {e}")
+        return None, False
+    except (requests.exceptions.RequestException, ValueError) as e:
+        # Raised once the session's retries are used up, or on a network error or unreadable response
+        print(f"[!]\tFailed to fetch devices: {e}")
+        return None, False
 
 def process_airthings_data(devices):
     """
@@ -92,81 +165,113 @@ def process_airthings_data(devices):
     Returns:
         dict: A nested dictionary organized by location and room, containing device information.
     """
-    organized_data = {}
+    organized_data = defaultdict(dict)
 
     for device in devices:
-        if device['deviceType'].startswith('WAVE_'):
-            location_name = device['location']['name']
-            room_name = device['segment']['name']
-            device_id = device['id']
-            device_type = device['deviceType']
-
-            if location_name not in organized_data:
-                organized_data[location_name] = {}
-
-            organized_data[location_name][room_name] = {
-                'id': device_id,
+        device_type = device['deviceType']
+        if device_type.startswith(wave_device_type_prefix):
+            organized_data[device['location']['name']][device['segment']['name']] = {
+                'id': device['id'],
                 'type': device_type
             }
 
-    return organized_data
-
-# def get_house_details(devices):
-#     """
-#     Collects details about houses and rooms to monitor.
+    return dict(organized_data)
 
-#     This function prompts the user to input information about houses and rooms,
-#     and associates them with available Airthings devices.
-
-#     Args:
-#         devices (list): A list of dictionaries containing device information.
-
-#     Returns:
-#         dict: A nested dictionary containing house and room information with associated device IDs.
-#     """
-#     house_inventory = {}
-
-#     print("[i]\tAvailable devices:")
-#     for i, device in enumerate(devices, 1):
-#         print(f"{i}. {device['deviceType']} - Serial: {device['id']}")
+def get_house_details(devices):
+    """
+    Collects details about houses and rooms to monitor.
 
-#     while True:
-#         house_name = input("\n[?]\tEnter a house name (or press Enter to finish): ")
-#         if not house_name:
-#             break
+    This function prompts the user to input information about houses and rooms,
+    and associates them with available Airthings devices.
 
-#         room_inventory = {}
-#         while True:
-#             room_name = input(f"[?]\tEnter a room name in {house_name} (or press Enter to finish): ")
-#             if not room_name:
-#                 break
+    Args:
+        devices (list): A list of dictionaries containing device information.
 
-#             device_index = safe_input("[?]\tEnter the number of the device for this room: ", int) - 1
-#             if 0 <= device_index < len(devices):
-#                 room_inventory[room_name] = devices[device_index]['id']
-#             else:
-#                 print("[!]\tInvalid device number. Please try again.")
+    Returns:
+        dict: A nested dictionary containing house and room information with associated devices.
+    """
+    devices = [device for device in devices if device['deviceType'].startswith(wave_device_type_prefix)]
+    house_inventory = {}
+    device_prompt = "[?]\tEnter the number of the device for this room: "
 
-#         house_inventory[house_name] = room_inventory
+    print("[i]\tAvailable devices:")
+    for i, device in enumerate(devices, 1):
+        print(f"{i}. {device['deviceType']} - Serial: {device['id']}")
 
-#     return house_inventory
+    while True:
+        house_name = input("\n[?]\tEnter a house name (or press Enter to finish): ")
+        if not house_name:
+            break
+
+        room_inventory = {}
+        room_prompt = f"[?]\tEnter a room name in {house_name} (or press Enter to finish): "
+        while True:
+            room_name = input(room_prompt)
+            if not room_name:
+                break
+
+            device_index = safe_input(device_prompt, int) - 1
+            if 0 <= device_index < len(devices):
+                room_inventory[room_name] = {
+                    'id': devices[device_index]['id'],
+                    'type': devices[device_index]['deviceType']
+                }
+            else:
+                print("[!]\tInvalid device number. Please try again.")
+
+        house_inventory[house_name] = room_inventory
+
+    return house_inventory
+
+def load_inventory():
+    """
+    Loads the existing inventory file, if there is one.
 
-def get_credentials():
+    Returns:
+        dict: The saved inventory data, or an empty dict if the file does not exist
+            or cannot be read as an inventory.
+    """
+    try:
+        data = fast_json.loads(inventory_path.read_bytes())
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        # An empty or broken file is rebuilt from scratch rather than stopping the script
+        print(f"[!]\tIgnoring {inventory_path}, it is not valid JSON: {e}")
+        return {}
+    if not isinstance(data, dict):
+        print(f"[!]\tIgnoring {inventory_path}, it does not contain an inventory")
+        return {}
+    return data
+
+def get_credentials(existing_data, reset=False):
     """
     Collects Airthings API credentials and ntfy.sh subscription name.
 
-    This function prompts the user to input the Airthings API client ID,
-    client secret, and the ntfy.sh subscription name.
+    Credentials already stored in the existing inventory are reused unless
+    reset is set. Otherwise this function prompts the user to input the
+    Airthings API client ID, client secret, and the ntfy.sh subscription name.
+
+    Args:
+        existing_data (dict): The previously saved inventory data.
+        reset (bool): Ask for new credentials even if some are saved (default is False).
 
     Returns:
         tuple: A tuple containing the client ID, client secret, and ntfy.sh subscription name.
     """
+    client_id = existing_data.get("airthings_client_id")
+    client_secret = existing_data.get("airthings_client_secret")
+    ntfy_url = existing_data.get("ntfy_url")
+    if client_id and client_secret and ntfy_url and not reset:
+        print(f"[i]\tUsing the credentials saved in {inventory_path}")
+        return client_id, client_secret, ntfy_url
+
     client_id = input("\n[?]\tEnter the client_id: ")
     client_secret = input("[?]\tEnter the client_secret: ")
     ntfy_url = input("\n[?]\tEnter the ntfy.sh subscription name: ")
     return client_id, client_secret, ntfy_url
 
-def save_to_file(data):
+def save_to_file(data, pretty=False):
     """
     Saves collected data to a JSON file.
 
@@ -175,11 +280,13 @@ def save_to_file(data):
 
     Args:
         data (dict): The inventory data to be saved.
+        pretty (bool): Indent the file for reading by hand (default is False).
     """
-    file_path = Path(__file__).resolve().parent / inventory_file_name
-    with open(file_path, "w") as file:
-        json.dump(data, file, indent=2)
-    print(f"\n[i]\tData has been saved to {file_path}")
+    fd = os.open(inventory_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    # The file object keeps writing until every byte is out, unlike a single os.write
+    with os.fdopen(fd, "wb") as file:
+        file.write(fast_json.dumps(data, pretty))
+    print(f"\n[i]\tData has been saved to {inventory_path}")
 
 def get_thresholds():
     """
@@ -194,47 +301,98 @@ def get_thresholds():
     battery_threshold = safe_input("[?]\tEnter the battery level threshold % (number only): ", int)
     return f_temp_threshold, battery_threshold
 
+def parse_args():
+    """
+    Parses the command line arguments.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Create the inventory.json file used by main.py.")
+    parser.add_argument(
+        "--mode",
+        choices=("airthings", "manual"),
+        default="airthings",
+        help="airthings: organize devices by their Airthings location and room; "
+             "manual: enter houses and rooms by hand (default: airthings)"
+    )
+    parser.add_argument(
+        "--pretty",
+        action="store_true",
+        help="indent inventory.json for reading and editing by hand"
+    )
+    parser.add_argument(
+        "--reset-credentials",
+        action="store_true",
+        help="ask for the Airthings credentials and ntfy.sh topic instead of reusing the saved ones"
+    )
+    return parser.parse_args()
+
 def main():
     """
     Main function to orchestrate data collection and storage.
 
     This function coordinates the process of collecting Airthings device information,
-    organizing it, and saving it to a file. It also handles user interaction for
-    confirming the use of the collected data.
+    organizing it, and saving it to a file. In airthings mode it also handles user
+    interaction for confirming the use of the collected data, falling back to manual
+    entry when the user declines.
     """
+    args = parse_args()
     clear()
-    client_id, client_secret, ntfy_url = get_credentials()
-    devices = get_airthings_devices(client_id, client_secret)
-    
-    if devices:
+    existing_data = load_inventory()
+    client_id, client_secret, ntfy_url = get_credentials(existing_data, args.reset_credentials)
+    devices, rejected = get_airthings_devices(client_id, client_secret)
+
+    # Saved credentials may have been rotated or revoked since they were stored
+    if rejected and client_id == existing_data.get("airthings_client_id") and client_secret == existing_data.get("airthings_client_secret"):
+        if input("\n[?]\tThe saved credentials did not work. Do you want to enter new ones? (y/n): ").lower() == 'y':
+            client_id, client_secret, ntfy_url = get_credentials(existing_data, reset=True)
+            devices, rejected = get_airthings_devices(client_id, client_secret)
+
+    if devices == []:
+        print("[!]\tNo devices were found on this Airthings account.")
+        return
+    if not devices:
+        if rejected:
+            print("[!]\tFailed to fetch devices from Airthings API. Please check your credentials.")
+        else:
+            print("[!]\tFailed to fetch devices from Airthings API. Please try again later.")
+        return
+
+    if args.mode == "manual":
+        organized_data = get_house_details(devices)
+    else:
         organized_data = process_airthings_data(devices)
-        print("\n[i]\tOrganized Airthings data:")
+        lines = ["\n[i]\tOrganized Airthings data:"]
         for location, rooms in organized_data.items():
-            print(f"\nLocation: {location}")
+            lines.append(f"\nLocation: {location}")
             for room, device in rooms.items():
-                print(f"  Room: {room}")
-                print(f"    Device ID: {device['id']}")
-                print(f"    Device Type: {device['type']}")
+                lines.append(f"  Room: {room}")
+                lines.append(f"    Device ID: {device['id']}")
+                lines.append(f"    Device Type: {device['type']}")
+        sys.stdout.write("\n".join(lines) + "\n")
 
         # Ask user if they want to use this data for the inventory
         use_data = input("\n[?]\tDo you want to use this data for your inventory? (y/n): ").lower() == 'y'
 
-        if use_data:
-            f_temp_threshold, battery_threshold = get_thresholds()
-            inventory_data = {
-                "inventory": organized_data, 
-                "airthings_client_id": client_id, 
-                "airthings_client_secret": client_secret, 
-                "ntfy_url": ntfy_url,
-                "f_temp_threshold": f_temp_threshold,
-                "battery_threshold": battery_threshold
-            }
-            save_to_file(inventory_data)
-        else:
+        if not use_data:
             print("[i]\tUser chose not to use the Airthings data. Please manually input the inventory.")
-            # Here you can call your original get_house_details() function if needed
-    else:
-        print("[!]\tFailed to fetch devices from Airthings API. Please check your credentials.")
+            organized_data = get_house_details(devices)
+
+    f_temp_threshold, battery_threshold = get_thresholds()
+    inventory_data = {
+        "inventory": organized_data, 
+        "airthings_client_id": client_id, 
+        "airthings_client_secret": client_secret, 
+        "ntfy_url": ntfy_url,
+        "f_temp_threshold": f_temp_threshold,
+        "battery_threshold": battery_threshold
+    }
+    # Skip the write when nothing changed, unless the file is being re-indented
+    if inventory_data == existing_data and not args.pretty:
+        print(f"\n[i]\tNo changes; {inventory_path} was left as is")
+        return
+    save_to_file(inventory_data, args.pretty)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,50 @@
+# fast_json.py
+"""
+JSON helpers shared by the Airthings scripts.
+
+The fastest available implementation is picked once at import time
+(orjson, then ujson, then the standard library). ``dumps`` always returns
+UTF-8 encoded bytes and ``loads`` accepts bytes or str, so callers can work
+with files opened in binary mode regardless of the backend in use.
+"""
+try:
+    import orjson
+
+    def dumps(data, pretty=False):
+        """
+        Serialize data to JSON bytes.
+
+        Args:
+            data: The object to serialize.
+            pretty (bool): Indent the output by two spaces instead of writing it compactly.
+
+        Returns:
+            bytes: The JSON document.
+        """
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else 0)
+
+    loads = orjson.loads
+except ImportError:
+    try:
+        import ujson as json
+        _compact = {}
+    except ImportError:
+        import json
+        _compact = {"separators": (",", ":")}
+
+    def dumps(data, pretty=False):
+        """
+        Serialize data to JSON bytes.
+
+        Args:
+            data: The object to serialize.
+            pretty (bool): Indent the output by two spaces instead of writing it compactly.
+
+        Returns:
+            bytes: The JSON document.
+        """
+        if pretty:
+            return json.dumps(data, indent=2).encode("utf-8")
+        return json.dumps(data, **_compact).encode("utf-8")
+
+    loads = json.loads
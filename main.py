@@ -1,29 +1,82 @@
 import os
-import json
+import time
+import signal
 import logging
+import argparse
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from pathlib import Path
-from datetime import datetime, timezone
-from logging.handlers import RotatingFileHandler
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from email.utils import formatdate
+from logging.handlers import MemoryHandler, RotatingFileHandler
+
+import fast_json
 
 inventory = "inventory.json"
+script_dir = Path(__file__).resolve().parent
 log_file_name = "airthings.log"
 home = os.path.expanduser('~')
 log_path = os.path.join(home, "airthings")
 log_full_path = os.path.join(log_path, log_file_name)
-os.makedirs(log_path, exist_ok=True)
-now = datetime.now()
+state_full_path = os.path.join(log_path, "state.json")
+token_full_path = os.path.join(log_path, "token.json")
 
 airthings_authorisation_url = "https://accounts-api.airthings.com/v1/token"
 token_req_payload = {"grant_type": "client_credentials", "scope": "read:device:current_values"}
-
-# Logging configuration
-log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-log_handler = RotatingFileHandler(log_full_path, maxBytes=524288, backupCount=5)
-log_handler.setFormatter(log_formatter)
+airthings_api_url = "https://ext-api.airthings.com/v1"
+device_url_template = airthings_api_url + "/devices/%s/latest-samples"
+ntfy_url_template = "https://ntfy.sh/%s"
+# Airthings Wave devices report temperature, humidity and battery; their types all share this prefix
+wave_device_type_prefix = "WAVE_"
+# Minimum gap between weekly reports, so one is sent per Sunday however often the script runs
+weekly_report_min_interval = 6 * 24 * 3600
+# Airthings devices publish a new sample roughly every 5 minutes; polling sooner than this returns the same data
+min_poll_interval = 240
+# Upper bound on concurrent latest-samples requests, to stay within Airthings rate limits
+max_fetch_workers = 10
+
+# Seconds to wait on connect/read, so one stalled request cannot hold up the whole run
+request_timeout = 10
+# Shared keep-alive session so each host costs one TCP+TLS handshake per run.
+# Idempotent requests (the device GETs) are retried on rate limiting and server errors;
+# POSTs are not, so a notification is never sent twice.
+http_session = requests.Session()
+http_session.headers.update({"User-Agent": "airthings-poller/1.0"})
+http_session.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=max_fetch_workers,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+))
+
+# A monitored device, as flattened from the inventory by device_records()
+DeviceRecord = namedtuple("DeviceRecord", ["location", "room", "device_id", "url"])
+
+# Logging configuration, attached by setup_logging()
 logger = logging.getLogger()
-logger.setLevel(logging.INFO)
-logger.addHandler(log_handler)
+log_buffer = None
+
+def setup_logging():
+    """
+    Create the ~/airthings directory and attach the log file handler.
+
+    This runs from main() rather than at import time, so importing this module
+    does not touch the filesystem. Calling it again has no effect.
+    """
+    global log_buffer
+    if log_buffer is not None:
+        return
+
+    os.makedirs(log_path, exist_ok=True)
+    log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    log_handler = RotatingFileHandler(log_full_path, maxBytes=524288, backupCount=5)
+    log_handler.setFormatter(log_formatter)
+    # Buffer records and write them out together; errors, and interpreter exit, flush the buffer
+    log_buffer = MemoryHandler(capacity=1024, flushLevel=logging.ERROR, target=log_handler)
+    logger.setLevel(logging.INFO)
+    logger.addHandler(log_buffer)
 
 def send_ntfy_msg(ntfy_topic: str, message: str):
     """
@@ -33,37 +86,127 @@ def send_ntfy_msg(ntfy_topic: str, message: str):
         ntfy_topic (str): The ntfy.sh topic to send the message to.
         message (str): The message content to be sent.
 
-    Raises:
-        RequestException: If there's an error sending the message.
+    Returns:
+        bool: True if the message was accepted, False otherwise.
     """
-    url = f"https://ntfy.sh/{ntfy_topic}"
+    url = ntfy_url_template % ntfy_topic
     headers = {'Content-Type': 'text/plain; charset=utf-8'}
     
     try:
-        response = requests.post(url, data=message.encode('utf-8'), headers=headers)
+        response = http_session.post(url, data=message.encode('utf-8'), headers=headers, timeout=request_timeout)
         response.raise_for_status()
+        return True
     except requests.exceptions.RequestException as e:
-        logging.error(f"Failed to send message to {ntfy_topic}: {e}")
+        logger.error(f"Failed to send message to {ntfy_topic}: {e}")
+        return False
 
-def airthings_auth():
+def read_cached_token(client_id):
     """
-    Authenticate with the Airthings API and obtain an access token.
+    Read the access token saved by an earlier run.
+
+    Args:
+        client_id (str): The Airthings API client ID the token must belong to.
 
     Returns:
-        str: The access token if successful, None otherwise.
+        str: The cached access token, or None if there is none, it was issued
+            for another client ID, or it expires within a minute.
+    """
+    try:
+        with open(token_full_path, "rb") as file:
+            cached = fast_json.loads(file.read())
+    except (FileNotFoundError, ValueError):
+        return None
+    if cached.get("client_id") != client_id or cached.get("expires_at", 0) <= time.time() + 60:
+        return None
+    return cached.get("access_token")
 
-    Raises:
-        RequestException: If there's an error during the authentication process.
+def save_cached_token(client_id, token, expires_at):
+    """
+    Save an access token for later runs, readable only by the current user.
+
+    Args:
+        client_id (str): The Airthings API client ID the token was issued for.
+        token (str): The access token.
+        expires_at (float): The UNIX time at which the token expires.
+    """
+    os.makedirs(log_path, exist_ok=True)
+    fd = os.open(token_full_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    # The file object keeps writing until every byte is out, unlike a single os.write
+    with os.fdopen(fd, "wb") as file:
+        file.write(fast_json.dumps({"client_id": client_id, "access_token": token, "expires_at": expires_at}))
+    os.chmod(token_full_path, 0o600)
+
+def invalidate_cached_token():
+    """
+    Remove the saved access token so the next authentication requests a new one.
     """
     try:
-        token_response = requests.post(airthings_authorisation_url, data=token_req_payload, allow_redirects=False, auth=(airthings_client_id, airthings_client_secret))
-        token_response.raise_for_status()
-        token = token_response.json().get("access_token")
+        os.remove(token_full_path)
+    except FileNotFoundError:
+        pass
+
+def request_access_token(client_id, client_secret):
+    """
+    Request a new access token from the Airthings API and save it for later runs.
+
+    Args:
+        client_id (str): The Airthings API client ID.
+        client_secret (str): The Airthings API client secret.
+
+    Returns:
+        str: The access token, or None if the response did not contain one.
+
+    Raises:
+        RequestException: If the request fails or the credentials are rejected.
+        ValueError: If the response is not valid JSON.
+    """
+    token_response = http_session.post(airthings_authorisation_url, data=token_req_payload, allow_redirects=False, auth=(client_id, client_secret), timeout=request_timeout)
+    token_response.raise_for_status()
+    token_data = fast_json.loads(token_response.content)
+
+    token = token_data.get("access_token")
+    if token and token_data.get("expires_in"):
+        save_cached_token(client_id, token, time.time() + token_data["expires_in"])
+    return token
+
+def airthings_auth(client_id, client_secret):
+    """
+    Authenticate with the Airthings API and obtain an access token.
+
+    A token saved by an earlier run for the same client ID is reused until
+    shortly before it expires.
+    Otherwise a new token is requested and saved for later runs.
+
+    Args:
+        client_id (str): The Airthings API client ID.
+        client_secret (str): The Airthings API client secret.
+
+    Returns:
+        str: The access token if successful, None otherwise.
+    """
+    token = read_cached_token(client_id)
+    if token:
         return token
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Failed to obtain Airthings access token: {e}")
+
+    try:
+        return request_access_token(client_id, client_secret)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.error(f"Failed to obtain Airthings access token: {e}")
         return None
 
+def is_unauthorized(error):
+    """
+    Check whether a failed request was rejected because of the access token.
+
+    Args:
+        error (Exception): The exception raised by the request.
+
+    Returns:
+        bool: True if the API answered 401 Unauthorized, False otherwise.
+    """
+    response = getattr(error, "response", None)
+    return isinstance(error, requests.exceptions.HTTPError) and response is not None and response.status_code == 401
+
 def read_from_file(file_name):
     """
     Read and parse JSON data from a file.
@@ -74,9 +217,46 @@ def read_from_file(file_name):
     Returns:
         dict: The parsed JSON data.
     """
-    file_path = Path(__file__).resolve().parent / file_name
-    with open(file_path, "r") as file:
-        return json.load(file)
+    return fast_json.loads((script_dir / file_name).read_bytes())
+
+def read_state():
+    """
+    Read the state saved by previous runs, such as when the last weekly report was sent.
+
+    Returns:
+        dict: The saved state, or an empty dict if there is none.
+    """
+    try:
+        with open(state_full_path, "rb") as file:
+            return fast_json.loads(file.read())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def write_state(state):
+    """
+    Save state for future runs.
+
+    Args:
+        state (dict): The state to save.
+    """
+    with open(state_full_path, "wb") as file:
+        file.write(fast_json.dumps(state))
+
+def is_weekly_report_due(now, last_report_ts):
+    """
+    Check whether the weekly report should be sent on this run.
+
+    The report goes out on the first run at or after 17:00 on a Sunday, unless
+    one has already been sent in the last six days.
+
+    Args:
+        now (datetime): The current local time.
+        last_report_ts (float): The UNIX timestamp of the last weekly report, or 0.
+
+    Returns:
+        bool: True if the weekly report should be sent, False otherwise.
+    """
+    return now.weekday() == 6 and now.hour >= 17 and now.timestamp() - last_report_ts >= weekly_report_min_interval
 
 def convert_timestamp_to_time(timestamp):
     """
@@ -88,22 +268,21 @@ def convert_timestamp_to_time(timestamp):
     Returns:
         str: The formatted date-time string.
     """
-    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(timestamp))
 
-def is_data_stale(timestamp: int, freshness_threshold_seconds: int = 3600) -> bool:
+def is_data_stale(timestamp: int, now_ts: float, freshness_threshold_seconds: int = 3600) -> bool:
     """
     Check if the data is stale based on its timestamp.
 
     Args:
         timestamp (int): The timestamp of the data.
+        now_ts (float): The current UNIX time, taken once per run.
         freshness_threshold_seconds (int): The threshold in seconds to consider data stale.
 
     Returns:
         bool: True if the data is stale, False otherwise.
     """
-    current_time = datetime.now(timezone.utc).timestamp()
-    data_age_seconds = current_time - timestamp
-    return data_age_seconds >= freshness_threshold_seconds
+    return now_ts - timestamp >= freshness_threshold_seconds
 
 def console_output(location, room, c_temp, f_temp, humi, batt):
     """
@@ -117,18 +296,43 @@ def console_output(location, room, c_temp, f_temp, humi, batt):
         humi (float): Humidity percentage.
         batt (float): Battery percentage.
     """
-    print(f"\t{location} {room}:")
-    print(f"\t  Temp: {f_temp}°F / {c_temp}°C")
-    print(f"\t  Humidity: {humi}%")
-    print(f"\t  Battery: {batt}%")
+    print(
+        f"\t{location} {room}:\n"
+        f"\t  Temp: {f_temp}°F / {c_temp}°C\n"
+        f"\t  Humidity: {humi}%\n"
+        f"\t  Battery: {batt}%"
+    )
+
+def device_records(inventory_map):
+    """
+    Flatten the nested inventory into a list of monitored devices.
+
+    Args:
+        inventory_map (dict): The inventory, keyed by location and then room.
 
-def fetch_device_data(device_id, api_headers):
+    Returns:
+        list: A DeviceRecord for every Wave device, whose url is the device's
+            latest-samples endpoint.
+    """
+    return [
+        DeviceRecord(location, room, device_info['id'], device_url_template % device_info['id'])
+        for location, rooms in inventory_map.items()
+        for room, device_info in rooms.items()
+        if device_info['type'].startswith(wave_device_type_prefix)
+    ]
+
+def fetch_device_data(device_url, api_headers, cached_sample=None):
     """
     Fetch the latest data for a specific device from the Airthings API.
 
+    If a previously seen sample is given, the request is made conditional on
+    its time, and the cached sample is returned when the API answers that
+    nothing has changed.
+
     Args:
-        device_id (str): The ID of the device to fetch data for.
+        device_url (str): The latest-samples URL of the device to fetch data for.
         api_headers (dict): The headers to use for the API request.
+        cached_sample (dict): The last sample seen for the device (default is None).
 
     Returns:
         dict: The latest data for the device.
@@ -136,12 +340,71 @@ def fetch_device_data(device_id, api_headers):
     Raises:
         RequestException: If there's an error fetching the device data.
     """
-    device_url = f"https://ext-api.airthings.com/v1/devices/{device_id}/latest-samples"
-    response = requests.get(url=device_url, headers=api_headers)
+    if cached_sample and 'time' in cached_sample:
+        api_headers = {**api_headers, 'If-Modified-Since': formatdate(cached_sample['time'], usegmt=True)}
+    response = http_session.get(url=device_url, headers=api_headers, timeout=request_timeout)
+    if response.status_code == 304 and cached_sample:
+        return cached_sample
     response.raise_for_status()
-    return response.json()['data']
+    return fast_json.loads(response.content)['data']
+
+def fetch_all_device_data(devices, api_headers):
+    """
+    Fetch the latest data for several devices concurrently.
+
+    All requests are started up front and results are yielded in order as
+    they become available, so the caller can process one device while the
+    requests for later devices are still in flight.
+
+    Args:
+        devices (list): (device_url, cached_sample) pairs for the devices to fetch data for.
+            cached_sample is the last sample seen for the device, or None.
+        api_headers (dict): The headers to use for the API requests.
+
+    Yields:
+        dict: The latest data for each device, in the same order as devices.
+            A device whose request failed, or whose response could not be parsed,
+            yields the raised exception instead.
+    """
+    def fetch(device):
+        device_url, cached_sample = device
+        try:
+            return fetch_device_data(device_url, api_headers, cached_sample)
+        except (requests.exceptions.RequestException, KeyError, ValueError) as e:
+            return e
+
+    if not devices:
+        return
+    with ThreadPoolExecutor(max_workers=min(max_fetch_workers, len(devices))) as executor:
+        yield from executor.map(fetch, devices)
+
+def celsius_to_fahrenheit(c_temp):
+    """
+    Convert a Celsius temperature to Fahrenheit, rounded to two decimals.
+
+    Args:
+        c_temp (float): Temperature in Celsius.
+
+    Returns:
+        float: Temperature in Fahrenheit.
+    """
+    return round(c_temp * 1.8 + 32, 2)
+
+def weekly_report_line(location, room, device_data):
+    """
+    Format the weekly report line for a single device.
+
+    Args:
+        location (str): The location name.
+        room (str): The room name.
+        device_data (dict): The latest data for the device.
+
+    Returns:
+        str: The report line.
+    """
+    return f"{location} {room} is {celsius_to_fahrenheit(device_data['temp'])}°F, battery is {device_data['battery']}%"
 
-def process_device_data(location, room, device_data, thresholds, ntfy_url, is_sunday, sunday_report):
+def process_device_data(location, room, device_data, now_ts, thresholds):
     """
     Process the data for a single device, checking thresholds and generating reports.
 
@@ -149,80 +412,215 @@ def process_device_data(location, room, device_data, thresholds, ntfy_url, is_su
         location (str): The location name.
         room (str): The room name.
         device_data (dict): The data for the device.
+        now_ts (float): The current UNIX time, taken once per run.
         thresholds (dict): The threshold values for various metrics.
-        ntfy_url (str): The ntfy.sh URL for sending notifications.
-        is_sunday (bool): Whether it's Sunday (for weekly reports).
-        sunday_report (str): The ongoing Sunday report string.
 
     Returns:
-        str: The updated Sunday report string.
+        list: The alert messages for this device.
     """
     timestamp, c_temp, humi, batt = device_data['time'], device_data['temp'], device_data['humidity'], device_data['battery']
+    alerts = []
+
+    if is_data_stale(timestamp, now_ts, thresholds['freshness_threshold_seconds']):
+        alerts.append(f"Data for {location} {room} is stale.")
     
-    if is_data_stale(timestamp, thresholds['freshness_threshold_seconds']):
-        message = f"Data for {location} {room} is stale."
-        send_ntfy_msg(ntfy_url, message)
-    
-    f_temp = (c_temp * 9/5) + 32
-    f_temp = float(f"{f_temp:0.2f}")
+    f_temp = celsius_to_fahrenheit(c_temp)
     console_output(location, room, c_temp, f_temp, humi, batt)
-    logging.info(f"{location} {room} - Temp:{f_temp} Humidity:{humi} Batt:{batt}")
+    logger.info(f"{location} {room} - Temp:{f_temp} Humidity:{humi} Batt:{batt}")
 
     if f_temp <= thresholds['f_temp_threshold']:
-        message = f"Brrr it's cold!\n{location} {room} is {f_temp}°F."
-        send_ntfy_msg(ntfy_url, message)
+        alerts.append(f"Brrr it's cold!\n{location} {room} is {f_temp}°F.")
     
     if batt < thresholds['batt_threshold']:
-        message = f"Battery Warning!\n{location} {room} is at {batt}%."
-        send_ntfy_msg(ntfy_url, message)
+        alerts.append(f"Battery Warning!\n{location} {room} is at {batt}%.")
 
-    if is_sunday:
-        sunday_report += f"{location} {room} is {f_temp}°F, battery is {batt}%\n"
-    
-    return sunday_report
+    return alerts
 
-def main():
+def fetch_records(records, token, client_id, client_secret, latest_samples):
     """
-    The main function that orchestrates the Airthings data fetching and processing.
+    Fetch the latest data for the given devices.
+
+    If the API rejects the access token, a new token is obtained and the
+    rejected devices are fetched once more.
+
+    Args:
+        records (list): DeviceRecords as returned by device_records().
+        token (str): The access token to start with.
+        client_id (str): The Airthings API client ID.
+        client_secret (str): The Airthings API client secret.
+        latest_samples (dict): The last sample seen for each device ID, used to
+            skip downloading samples that have not changed.
+
+    Yields:
+        tuple: Each DeviceRecord with its latest data, or with the exception raised while fetching it.
     """
-    global airthings_client_id, airthings_client_secret
-    inventory_data = read_from_file('inventory.json')
+    def devices(records):
+        return [(record.url, latest_samples.get(record.device_id)) for record in records]
+
+    rejected = []
+    api_headers = {"Authorization": f"Bearer {token}"}
+    for record, device_data in zip(records, fetch_all_device_data(devices(records), api_headers)):
+        if is_unauthorized(device_data):
+            rejected.append(record)
+        else:
+            yield record, device_data
+
+    # The token was rejected (revoked or expired early): get a new one and retry those devices once
+    if rejected:
+        invalidate_cached_token()
+        token = airthings_auth(client_id, client_secret)
+        if not token:
+            logger.error("Failed to obtain a new Airthings token after the cached one was rejected.")
+            yield from ((record, PermissionError("access token rejected")) for record in rejected)
+            return
+        api_headers = {"Authorization": f"Bearer {token}"}
+        yield from zip(rejected, fetch_all_device_data(devices(rejected), api_headers))
+
+def check_devices():
+    """
+    Run one check: fetch the latest samples for every device in the inventory,
+    then log them and send any alerts and the weekly report.
+    """
+    inventory_data = read_from_file(inventory)
     
     if not inventory_data:
-        logging.error("Inventory data is not available. Please check the file.")
+        logger.error("Inventory data is not available. Please check the file.")
         return
 
-    airthings_client_id = inventory_data["airthings_client_id"]
-    airthings_client_secret = inventory_data["airthings_client_secret"]
-
     thresholds = {
         'freshness_threshold_seconds': 3600,
         'f_temp_threshold': inventory_data["f_temp_threshold"],
         'batt_threshold': inventory_data["battery_threshold"]
     }
 
-    token = airthings_auth()
-    if not token:
-        logging.error("Failed to obtain Airthings token. Exiting.")
+    records = device_records(inventory_data.get("inventory", {}))
+    if not records:
+        logger.error("No Wave devices found in the inventory. Nothing to check.")
         return
 
-    api_headers = {"Authorization": f"Bearer {token}"}
+    state = read_state()
     now = datetime.now()
-    is_sunday = now.weekday() == 6 and now.hour == 17 and now.minute == 0
-    sunday_report = "Weekly Report\n"
-    
+    now_ts = now.timestamp()
+    weekly_report_due = is_weekly_report_due(now, state.get("last_weekly_report", 0))
+    latest_samples = state.setdefault("latest_samples", {})
+
+    # A device that reported less than min_poll_interval ago cannot have a newer sample yet,
+    # so its saved sample is still current and it is not fetched
+    current = {
+        record.device_id for record in records
+        if now_ts - latest_samples.get(record.device_id, {}).get('time', 0) < min_poll_interval
+    }
+    due = [record for record in records if record.device_id not in current]
+    if not due and not weekly_report_due:
+        logger.info("No device is due a new sample yet. Nothing to check.")
+        return
+
+    alerts = []
+    auth_alert = False
+    client_id, client_secret = inventory_data["airthings_client_id"], inventory_data["airthings_client_secret"]
+    token = airthings_auth(client_id, client_secret) if due else None
+    if due and not token:
+        # Don't send N requests that are bound to fail; tell the user once until authentication works again
+        logger.error("Failed to obtain Airthings token. Skipping device fetches.")
+        if not state.get("auth_failing"):
+            alerts.append("Airthings authentication failed!\nCheck the client ID and secret in inventory.json.")
+            auth_alert = True
+    elif token:
+        state.pop("auth_failing", None)
+        for record, device_data in fetch_records(due, token, client_id, client_secret, latest_samples):
+            if isinstance(device_data, Exception):
+                logger.error(f"Error fetching device data for {record.location} {record.room}: {device_data}")
+                continue
+            latest_samples[record.device_id] = device_data
+            current.add(record.device_id)
+            alerts.extend(process_device_data(record.location, record.room, device_data, now_ts, thresholds))
+
+    # The weekly report covers every device with a current sample, fetched this run or not
+    if weekly_report_due:
+        report = [
+            weekly_report_line(record.location, record.room, latest_samples[record.device_id])
+            for record in records if record.device_id in current
+        ]
+        alerts.append("Weekly Report\n" + "\n".join(report))
+
+    # Send everything for this run as a single notification
+    # Only record what was actually delivered, so a failed send is retried on the next run
+    if alerts and send_ntfy_msg(inventory_data["ntfy_url"], "\n\n".join(alerts)):
+        if weekly_report_due:
+            state["last_weekly_report"] = now_ts
+        if auth_alert:
+            state["auth_failing"] = True
+    write_state(state)
+
+def handle_sigterm(signum, frame):
+    """
+    Turn SIGTERM into a normal interpreter exit so cleanup code runs.
+    """
+    raise SystemExit(0)
+
+def run_forever(interval):
+    """
+    Check the devices repeatedly, sleeping between checks.
+
+    The HTTP session, its open connections and the cached access token stay
+    warm between checks. A failed check is logged and the loop carries on.
+    SIGTERM stops the loop after flushing the log and closing the session.
+
+    Args:
+        interval (int): The number of seconds to wait between checks.
+    """
+    signal.signal(signal.SIGTERM, handle_sigterm)
     try:
-        for location, rooms in inventory_data["inventory"].items():
-            for room, device_info in rooms.items():
-                if device_info['type'].startswith('WAVE_'):
-                    device_id = device_info['id']
-                    device_data = fetch_device_data(device_id, api_headers)
-                    sunday_report = process_device_data(location, room, device_data, thresholds, inventory_data["ntfy_url"], is_sunday, sunday_report)
-        
-        if is_sunday:
-            send_ntfy_msg(inventory_data["ntfy_url"], sunday_report)
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Error fetching device data: {e}")
+        while True:
+            try:
+                check_devices()
+            except Exception:
+                logger.exception("Device check failed")
+            log_buffer.flush()
+            time.sleep(interval)
+    finally:
+        http_session.close()
+        log_buffer.flush()
+
+def parse_args():
+    """
+    Parse the command line arguments.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Check Airthings devices and send alerts through ntfy.sh.")
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="keep running and check the devices every --interval seconds instead of once"
+    )
+    parser.add_argument(
+        "--interval",
+        type=int,
+        default=300,
+        help="seconds between checks when running with --daemon (default: 300)"
+    )
+    args = parser.parse_args()
+    if args.interval < 1:
+        parser.error("--interval must be at least 1 second")
+    return args
+
+def main():
+    """
+    The main function that orchestrates the Airthings data fetching and processing.
+    """
+    args = parse_args()
+    setup_logging()
+    if args.daemon:
+        run_forever(args.interval)
+        return
+
+    try:
+        check_devices()
+    finally:
+        # Write this run's buffered log records now rather than waiting for interpreter exit
+        log_buffer.flush()
 
 if __name__ == "__main__":
     main()